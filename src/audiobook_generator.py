@@ -2,16 +2,35 @@ import os
 import re
 import time
 import logging
+import argparse
+import json
+import wave
+import heapq
+import threading
+import queue
+from xml.sax.saxutils import escape as xml_escape
+import hashlib
+import struct
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from pathlib import Path
 from google.cloud import texttospeech_v1
 from google.cloud.storage import Client as StorageClient
+from google.cloud.storage import transfer_manager
 from google.api_core import exceptions as gcp_exceptions
+from google.oauth2 import service_account
 import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
 from docx import Document
 import nltk
 from tqdm import tqdm
+import numpy as np
+
+# Optional: scipy enables the K-weighting filter for true LUFS measurement
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
 
 # --- Project Directory Setup ---
 # Get the project root directory (parent of src/)
@@ -41,7 +60,7 @@ logger = logging.getLogger(__name__)
 # --- Configuration ---
 
 # IMPORTANT: Before running, ensure you have installed the required libraries:
-# pip install google-cloud-texttospeech google-cloud-storage ebooklib beautifulsoup4 python-docx nltk
+# pip install google-cloud-texttospeech google-cloud-storage ebooklib beautifulsoup4 python-docx nltk numpy
 
 # IMPORTANT: For NLTK sentence tokenization, you need the 'punkt' resource.
 # Run this in a Python interpreter ONCE to download it:
@@ -122,6 +141,116 @@ max_chunk_length = 180     # Increased from 150
 max_timeout = 1800         # 30 minutes instead of 10
 retry_attempts = 3         # Number of retry attempts
 
+# 13. GCS CLEANUP AND RECONCILIATION
+gcs_batch_size = 100       # Max deletes per batched request (GCS batch limit)
+reconcile_workers = 8      # Parallel downloads when reconciling leftover outputs
+# Set STORAGE_EMULATOR_HOST (e.g. http://localhost:4443) to run against a local emulator
+storage_emulator_host = os.environ.get('STORAGE_EMULATOR_HOST')
+
+# 14. MULTI-VOICE FAN-OUT
+# List (language_code, voice_name) pairs to render the same book in several voices.
+# Each chapter is extracted and preprocessed once; outputs go to output/<voice_name>/.
+# Leave empty to use the single voice from section 6.
+fan_out_voices = []
+#fan_out_voices = [('en-GB', 'en-GB-Chirp3-HD-Despina'), ('en-GB', 'en-GB-Chirp3-HD-Umbriel')]
+max_concurrent_operations = 3  # Long-audio operations in flight at once (keep within quota)
+
+# 15. ADAPTIVE TIMEOUTS AND ESTIMATES
+# Every downloaded chapter records its synthesis latency and audio length here;
+# once enough runs exist, timeouts, ETAs and durations are fitted from this history.
+synthesis_history_file = LOGS_DIR / 'synthesis_history.jsonl'
+min_history_samples = 3     # Runs needed before the learned model replaces the defaults
+timeout_safety_factor = 2.0 # Timeout = predicted latency x this factor
+min_timeout = 120           # Never wait less than 2 minutes
+
+# 16. PREVIEW MODE (run with --preview)
+# Renders a short excerpt of each selected chapter through the synchronous TTS API
+# to check voice, pronunciation and preprocessing before paying for the full book.
+preview_sentence_count = 3      # Sentences per chapter in each preview clip
+preview_excerpt_mode = 'start'  # 'start' = first sentences, 'sample' = spread across the chapter
+preview_max_bytes = 4800        # Synchronous API accepts up to 5000 bytes per request
+preview_workers = 8             # Preview clips synthesized in parallel
+preview_output_directory = OUTPUT_DIR / "preview"
+
+# 17. LIVE PROGRESS
+progress_poll_seconds = 15            # How often each in-flight operation's metadata is polled
+progress_refresh_seconds = 1          # How often the progress view redraws
+
+# 18. BOILERPLATE AND DUPLICATE DETECTION
+# Front/back matter (copyright, contents, ads) and near-duplicate chapters are
+# flagged and left out of the default selection and the cost estimate.
+skip_boilerplate = True
+duplicate_similarity_threshold = 0.8  # Estimated Jaccard similarity that counts as a duplicate
+minhash_signature_size = 128          # Hashes kept per chapter (bottom-k MinHash)
+shingle_size = 5                      # Words per shingle
+boilerplate_max_words = 1500          # Longer chapters are never flagged as front/back matter
+boilerplate_patterns = [
+    r'\bcopyright\b', r'all rights reserved', r'\bisbn\b', r'table of contents',
+    r'\bdedication\b', r'title page', r'also by\b', r'about the author', r'about the publisher',
+    r'praise for\b', r'sign up for', r'newsletter', r'\bpublished by\b', r'first edition',
+    r'coming soon', r'cover design', r'printed in',
+]
+boilerplate_title_patterns = [r'^contents$']  # Checked against the chapter title only
+toc_max_words_per_entry = 15          # A table of contents lists titles at most this many words apart on average
+
+# 19. SYNTHESIS TARGETS (project / credentials / bucket pool)
+# Chapters are spread across every target by free capacity; a target that
+# reports quota exhaustion is drained and skipped for quota_cooldown_seconds.
+# Leave empty to use project_id, gcs_bucket_name and the service account above.
+synthesis_targets = []
+#synthesis_targets = [
+#    {'project_id': 'project-a', 'credentials': CREDENTIALS_DIR / 'project-a.json', 'bucket': 'bucket-a', 'max_concurrent': 3},
+#    {'project_id': 'project-b', 'credentials': CREDENTIALS_DIR / 'project-b.json', 'bucket': 'bucket-b', 'max_concurrent': 2},
+#]
+quota_cooldown_seconds = 300  # How long an exhausted target is skipped
+
+# 20. AUDIO INTEGRITY CHECK
+# Every downloaded WAV is checked for a consistent header, long digital silence,
+# clipping and a plausible duration; chapters that fail are re-synthesized.
+validate_audio = True
+max_silence_gap_seconds = 8.0  # Longer stretches of digital silence mean a broken synthesis
+silence_threshold = 64         # Samples at or below this amplitude (16-bit) count as silence
+silence_window_seconds = 0.01  # Silence is detected per window of this length
+max_clipped_ratio = 0.001      # Share of full-scale samples allowed
+duration_tolerance = 0.5       # Allowed relative deviation from the expected duration
+max_resynthesis_attempts = 2   # Re-synthesis rounds for chapters that fail the check
+audio_block_frames = 1 << 20   # Frames per NumPy block when scanning WAV files
+
+# 21. LOUDNESS NORMALIZATION AND SILENCE TRIMMING
+# Each downloaded chapter gets one gain toward the target loudness, and long
+# leading/trailing/internal silences are trimmed. Files are streamed in blocks,
+# so memory per worker stays the same whatever the chapter length.
+normalize_audio = True
+target_loudness_lufs = -18.0        # Integrated loudness target (LUFS; unweighted without scipy)
+max_gain_db = 20.0                  # Never boost or cut by more than this
+trim_silence_dbfs = -50.0           # Windows quieter than this count as silence when trimming
+leading_silence_seconds = 0.5       # Silence kept before the first word
+trailing_silence_seconds = 1.0      # Silence kept after the last word
+max_internal_silence_seconds = 2.0  # Longer pauses inside a chapter are capped to this
+postprocess_workers = os.cpu_count() or 2
+
+# 22. PARALLEL PREPROCESSING
+# Text preprocessing runs in worker processes as soon as chapters are extracted
+# (while the cost estimate and chapter menu are shown) and feeds a bounded queue
+# of ready-to-submit synthesis jobs.
+preprocess_workers = os.cpu_count() or 2
+preprocess_queue_size = 8  # Ready jobs buffered ahead of the synthesis workers
+
+# 23. SHORT CHAPTER PACKING
+# Consecutive short chapters (part dividers, poems, interludes) are joined into
+# one long-audio request with a long pause between them; the returned audio is
+# split back into <base>_<n>.wav files at those pauses.
+pack_short_chapters = True
+pack_max_chapter_bytes = 3000   # Chapters up to this size (after preprocessing) can be packed
+pack_max_request_bytes = 60000  # Text per packed request
+pack_marker_seconds = 5.0       # SSML break between packed chapters (breaks max out at 10s)
+pack_marker_min_seconds = 3.5   # Silences at least this long are taken as chapter markers when splitting
+# Chirp 3 HD voices don't take SSML; their packed requests use markup, with a
+# run of pause tags (roughly a second each) as the marker
+markup_voices = ['Chirp3-HD']
+pack_markup_pause = '[pause long]'
+pack_markup_pause_count = 6
+
 # --- End of Configuration ---
 
 def get_file_type(filepath):
@@ -319,8 +448,12 @@ def generate_filename(base_name, sequential_number):
     """Generate simplified filename."""
     return f"{base_name}_{sequential_number}"
 
-def aggressive_sentence_splitting(text, max_length=max_sentence_length):
-    """Aggressively splits long sentences with multiple fallback strategies."""
+def generate_packed_filename(base_name, first_number, last_number):
+    """Filename for a packed request covering chapters first_number..last_number."""
+    return f"{base_name}_{first_number}-{last_number}"
+
+def tokenize_sentences(text):
+    """Splits text into sentences with NLTK, falling back to splitting on periods."""
     try:
         try:
             nltk.data.find('tokenizers/punkt')
@@ -328,10 +461,14 @@ def aggressive_sentence_splitting(text, max_length=max_sentence_length):
             logger.info("Downloading NLTK punkt tokenizer...")
             nltk.download('punkt', quiet=True)
         
-        sentences = nltk.sent_tokenize(text)
+        return nltk.sent_tokenize(text)
     except:
         sentences = text.split('.')
-        sentences = [s.strip() + '.' for s in sentences if s.strip()]
+        return [s.strip() + '.' for s in sentences if s.strip()]
+
+def aggressive_sentence_splitting(text, max_length=max_sentence_length):
+    """Aggressively splits long sentences with multiple fallback strategies."""
+    sentences = tokenize_sentences(text)
     
     processed_sentences = []
     
@@ -490,24 +627,168 @@ def robust_text_preprocessing(text, chapter_title):
         logger.info(f"Returning original text for '{chapter_title}'")
         return text
 
-def select_chapters_to_process(chapters_list):
-    """Shows available chapters and allows user to select which ones to process."""
+def word_shingles(text, size=None):
+    """Returns the set of hashed word n-grams (shingles) of a text."""
+    size = size or shingle_size
+    words = re.findall(r'\w+', text.lower())
+    if len(words) < size:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = (' '.join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+        for gram in grams
+    }
+
+def minhash_signature(shingles, signature_size=None):
+    """Bottom-k MinHash signature: the k smallest shingle hashes."""
+    return set(heapq.nsmallest(signature_size or minhash_signature_size, shingles))
+
+def estimate_similarity(signature_a, signature_b, signature_size=None):
+    """Estimates the Jaccard similarity of two texts from their bottom-k signatures."""
+    if not signature_a or not signature_b:
+        return 0.0
+    union_sample = set(heapq.nsmallest(signature_size or minhash_signature_size, signature_a | signature_b))
+    return len(union_sample & signature_a & signature_b) / len(union_sample)
+
+def count_listed_titles(lowered_text, titles, index):
+    """
+    Counts chapter titles a text lists the way a table of contents does.
+
+    Titles are matched as whole words; only the longest run that appears in
+    book order is counted, and only if its entries sit close together
+    (toc_max_words_per_entry on average). Prose that happens to mention a
+    few titles in passing scores 0.
+    """
+    hits = []
+    for i, title in enumerate(titles):
+        if i == index or len(title) <= 3:
+            continue
+        match = re.search(rf'\b{re.escape(title)}\b', lowered_text)
+        if match:
+            hits.append((match.start(), i))
+    if not hits:
+        return 0
+    hits.sort()
+
+    # Longest subsequence whose chapter numbers increase with their position in the text
+    run_lengths = [1] * len(hits)
+    previous = [None] * len(hits)
+    for j in range(len(hits)):
+        for k in range(j):
+            if hits[k][1] < hits[j][1] and run_lengths[k] + 1 > run_lengths[j]:
+                run_lengths[j] = run_lengths[k] + 1
+                previous[j] = k
+    end = max(range(len(hits)), key=run_lengths.__getitem__)
+    start = end
+    while previous[start] is not None:
+        start = previous[start]
+
+    span_words = len(lowered_text[hits[start][0]:hits[end][0]].split())
+    if span_words > toc_max_words_per_entry * run_lengths[end]:
+        return 0
+    return run_lengths[end]
+
+def classify_chapters(chapters_list):
+    """
+    Flags chapters that are usually not worth synthesizing.
+
+    Near-duplicates of an earlier chapter are found with shingling and
+    bottom-k MinHash. Front and back matter is recognised from short length,
+    boilerplate phrases in the title or text, position in the book, and
+    tables of contents that list the other chapter titles in order.
+
+    Args:
+        chapters_list: List of (title, text, chapter_num, original_title) tuples
+
+    Returns:
+        Dictionary of chapter index -> reason for skipping
+    """
+    skip_reasons = {}
+    chapter_count = len(chapters_list)
+    signatures = [minhash_signature(word_shingles(text)) for _, text, _, _ in chapters_list]
+    other_titles = [original_title.strip().lower() for _, _, _, original_title in chapters_list]
+
+    for index, (title, text, chapter_num, original_title) in enumerate(chapters_list):
+        # Near-duplicate of an earlier chapter
+        for earlier in range(index):
+            if earlier in skip_reasons and skip_reasons[earlier].startswith("duplicate"):
+                continue
+            similarity = estimate_similarity(signatures[index], signatures[earlier])
+            if similarity >= duplicate_similarity_threshold:
+                skip_reasons[index] = f"duplicate of #{earlier + 1} ({similarity:.0%} similar)"
+                break
+        if index in skip_reasons:
+            continue
+
+        word_count = len(text.split())
+        if word_count > boilerplate_max_words:
+            continue
+
+        lowered_title = original_title.strip().lower()
+        lowered_text = text.lower()
+        position = 'front matter' if index < chapter_count / 2 else 'back matter'
+
+        # Tables of contents list most of the other chapter titles, in order and close together
+        listed_titles = count_listed_titles(lowered_text, other_titles, index)
+        if chapter_count > 3 and listed_titles >= max(3, (chapter_count - 1) // 2):
+            skip_reasons[index] = f"table of contents ({listed_titles} chapter titles listed)"
+            continue
+
+        title_hits = body_hits = 0
+        for pattern in boilerplate_patterns:
+            if re.search(pattern, lowered_title):
+                title_hits += 1
+            elif re.search(pattern, lowered_text):
+                body_hits += 1
+        title_hits += sum(1 for pattern in boilerplate_title_patterns if re.search(pattern, lowered_title))
+        score = 2 * title_hits + body_hits
+        # A single phrase in the body ("also by the shore") is too common in prose for position to tip it
+        if (title_hits or body_hits >= 2) and (index < chapter_count * 0.15 or index >= chapter_count * 0.85):
+            score += 1
+
+        if score >= 2:
+            skip_reasons[index] = position
+
+    for index, reason in sorted(skip_reasons.items()):
+        logger.info(f"Flagged chapter {index + 1} '{chapters_list[index][3]}' to skip: {reason}")
+
+    return skip_reasons
+
+def select_chapters_to_process(chapters_list, skip_reasons=None):
+    """
+    Shows available chapters and allows user to select which ones to process.
+
+    Chapters in skip_reasons are marked and left out when the user accepts the
+    default; 'all' includes them, and explicit chapter numbers always win.
+    """
+    skip_reasons = skip_reasons or {}
+
     print("\n" + "="*60)
     print("CHAPTERS FOUND:")
     print("="*60)
     
     for i, (title, text, chapter_num, original_title) in enumerate(chapters_list, 1):
         word_count = len(text.split())
-        print(f"{i:2d}. {original_title} ({word_count:,} words)")
+        skip_note = f"  [skip: {skip_reasons[i - 1]}]" if (i - 1) in skip_reasons else ""
+        print(f"{i:2d}. {original_title} ({word_count:,} words){skip_note}")
     
     print("="*60)
     print(f"Total: {len(chapters_list)} chapters found")
+    if skip_reasons:
+        print(f"Skipped by default: {len(skip_reasons)} front/back matter or duplicate chapters")
     print("="*60)
     
     while True:
-        choice = input("\nProcess all chapters? (y/n) or enter chapter numbers (e.g., 1,3,5-7): ").strip().lower()
+        if skip_reasons:
+            prompt = "\nProcess all chapters except skipped? (y/n/all) or enter chapter numbers (e.g., 1,3,5-7): "
+        else:
+            prompt = "\nProcess all chapters? (y/n) or enter chapter numbers (e.g., 1,3,5-7): "
+        choice = input(prompt).strip().lower()
         
         if choice in ['y', 'yes', '']:
+            return [i for i in range(len(chapters_list)) if i not in skip_reasons]
+        elif choice == 'all':
             return list(range(len(chapters_list)))
         elif choice in ['n', 'no']:
             print("Exiting without processing.")
@@ -547,23 +828,17 @@ def select_chapters_to_process(chapters_list):
             except ValueError:
                 print("Invalid input. Please use format like: 1,3,5-7 or 'y' for all")
 
-def enhanced_synthesize_long_audio(chapter_title, chapter_text, chapter_number, original_title, 
-                                 filename_base, sequential_number, gcs_bucket, project_id, 
-                                 location, voice_name, voice_language_code):
-    """Enhanced audio synthesis with better error handling, logging, and retry logic."""
-    base_filename = generate_filename(filename_base, sequential_number)
-    timestamp = int(time.time())
-    gcs_output_uri = f"gs://{gcs_bucket}/{base_filename}_{timestamp}.wav"
-    
+def prepare_chapter_text(chapter_title, chapter_text, chapter_number, original_title):
+    """
+    Adds the chapter announcement, preprocesses the text and checks its size.
+
+    Returns:
+        (processed_text, text_size) or (None, None) if the chapter can't be synthesized
+    """
     if not chapter_text.strip():
         logger.warning(f"Chapter '{original_title}' has no text content. Skipping.")
         return None, None
 
-    logger.info(f"="*60)
-    logger.info(f"PROCESSING CHAPTER {sequential_number}: '{original_title}'")
-    logger.info(f"Output filename: {base_filename}.wav")
-    logger.info(f"="*60)
-    
     # Create the chapter announcement text
     if chapter_number is not None:
         chapter_announcement = f"Chapter {chapter_number}. {chapter_title}."
@@ -585,21 +860,42 @@ def enhanced_synthesize_long_audio(chapter_title, chapter_text, chapter_number,
     if not is_within_limit:
         logger.error(f"SKIPPING: Chapter '{original_title}' exceeds size limits even after processing")
         return None, None
-    
-    # Calculate enhanced timeout
-    base_timeout = 300  # 5 minutes base
-    size_timeout = text_size / 500  # 1 second per 500 bytes (more generous)
-    calculated_timeout = min(base_timeout + size_timeout, max_timeout)
+
+    return processed_text, text_size
+
+def submit_long_audio_synthesis(processed_text, text_size, original_title, base_filename,
+                                gcs_bucket, project_id, location, voice_name,
+                                voice_language_code, gcs_prefix="", model=None,
+                                progress_callback=None, client=None, reroute_on_quota=False,
+                                input_type="text"):
+    """
+    Runs one long-audio synthesis operation with retry logic.
+
+    The operation is polled every progress_poll_seconds; progress_callback,
+    if given, receives its SynthesizeLongAudioMetadata on each poll. With
+    reroute_on_quota, ResourceExhausted is raised to the caller instead of
+    waiting for the quota to reset, so the job can move to another target.
+    input_type is the SynthesisInput field processed_text goes in: "text",
+    or "ssml" / "markup" for packed chapters.
+
+    Returns:
+        (gcs_uri, latency_seconds) of the successful attempt, or (None, None) if every attempt failed
+    """
+    timestamp = int(time.time())
+    gcs_output_uri = f"gs://{gcs_bucket}/{gcs_prefix}{base_filename}_{timestamp}.wav"
+
+    # Timeout from the learned latency model, or the default formula without history
+    calculated_timeout = predict_synthesis_timeout(text_size, model)
     
     logger.info(f"Text size: {text_size} bytes, Calculated timeout: {int(calculated_timeout)} seconds")
     
     # Create client and request
-    client = texttospeech_v1.TextToSpeechLongAudioSynthesizeClient()
+    client = client or texttospeech_v1.TextToSpeechLongAudioSynthesizeClient()
     parent = f"projects/{project_id}/locations/{location}"
     
     request = {
         "parent": parent,
-        "input": {"text": processed_text},
+        "input": {input_type: processed_text},
         "voice": {
             "language_code": voice_language_code,
             "name": voice_name
@@ -612,20 +908,38 @@ def enhanced_synthesize_long_audio(chapter_title, chapter_text, chapter_number,
     
     # Retry logic
     for attempt in range(retry_attempts):
+        operation = None
         try:
-            logger.info(f"Attempt {attempt + 1}/{retry_attempts}: Starting audio synthesis...")
+            logger.info(f"Attempt {attempt + 1}/{retry_attempts}: Starting audio synthesis ({voice_name})...")
             
+            started = time.time()
             operation = client.synthesize_long_audio(request=request)
             
             logger.info(f"Waiting for synthesis to complete (timeout: {int(calculated_timeout)} seconds)...")
             
-            result = operation.result(timeout=calculated_timeout)
+            deadline = started + calculated_timeout
+            while not operation.done():
+                if progress_callback and operation.metadata is not None:
+                    progress_callback(operation.metadata)
+                if time.time() > deadline:
+                    raise gcp_exceptions.DeadlineExceeded(f"Operation still running after {int(calculated_timeout)} seconds")
+                time.sleep(progress_poll_seconds)
+
+            result = operation.result()
+            latency = time.time() - started
             
-            logger.info(f"✅ SUCCESS: Synthesis completed for '{original_title}'")
-            return gcs_output_uri, base_filename + ".wav"
+            logger.info(f"✅ SUCCESS: Synthesis completed for '{original_title}' ({voice_name}) in {int(latency)} seconds")
+            return gcs_output_uri, latency
             
         except gcp_exceptions.DeadlineExceeded:
             logger.error(f"❌ TIMEOUT: Synthesis timed out for '{original_title}' (attempt {attempt + 1})")
+            # Stop the timed-out operation so a retry doesn't run (and bill) alongside it
+            if operation is not None:
+                try:
+                    operation.cancel()
+                    logger.info(f"Cancelled timed-out operation for '{original_title}'")
+                except Exception as e:
+                    logger.warning(f"Could not cancel timed-out operation for '{original_title}': {e}")
             if attempt < retry_attempts - 1:
                 wait_time = 60 * (attempt + 1)
                 logger.info(f"Waiting {wait_time} seconds before retry...")
@@ -635,6 +949,8 @@ def enhanced_synthesize_long_audio(chapter_title, chapter_text, chapter_number,
                 
         except gcp_exceptions.ResourceExhausted:
             logger.error(f"❌ QUOTA EXCEEDED: API quota exhausted for '{original_title}' (attempt {attempt + 1})")
+            if reroute_on_quota:
+                raise
             if attempt < retry_attempts - 1:
                 wait_time = 300
                 logger.info(f"Waiting {wait_time} seconds for quota reset...")
@@ -657,55 +973,1493 @@ def enhanced_synthesize_long_audio(chapter_title, chapter_text, chapter_number,
     
     return None, None
 
-def download_from_gcs(gcs_uri, local_directory, final_filename):
-    """Downloads a file from Google Cloud Storage."""
+class SynthesisTarget:
+    """
+    One place long-audio operations can run: a project, its credentials and an output bucket.
+
+    Clients are created lazily and shared by all workers on the target, unless
+    already-built tts_client/storage_client objects are passed in.
+    """
+
+    def __init__(self, project_id, bucket, credentials=None, location="global",
+                 max_concurrent=None, name=None, tts_client=None, storage_client=None):
+        self.project_id = project_id
+        self.bucket = bucket
+        self.credentials = credentials
+        self.location = location
+        self.max_concurrent = max_concurrent or max_concurrent_operations
+        self.name = name or project_id
+        self._tts_client = tts_client
+        self._storage_client = storage_client
+        self._client_lock = threading.Lock()
+        self._loaded_credentials = None
+
+    def _load_credentials(self):
+        if self.credentials and self._loaded_credentials is None:
+            self._loaded_credentials = service_account.Credentials.from_service_account_file(str(self.credentials))
+        return self._loaded_credentials
+
+    def tts_client(self):
+        """Long-audio synthesis client authenticated for this target."""
+        with self._client_lock:
+            if self._tts_client is None:
+                self._tts_client = texttospeech_v1.TextToSpeechLongAudioSynthesizeClient(
+                    credentials=self._load_credentials()
+                )
+            return self._tts_client
+
+    def storage_client(self):
+        """Cloud Storage client authenticated for this target."""
+        with self._client_lock:
+            if self._storage_client is None:
+                self._storage_client = get_storage_client(self._load_credentials(), self.project_id)
+            return self._storage_client
+
+def build_synthesis_targets(target_configs=None):
+    """
+    Creates SynthesisTargets from config dicts, or the single default target.
+
+    Each dict needs 'project_id' and 'bucket'; 'credentials', 'location',
+    'max_concurrent', 'name', 'tts_client' and 'storage_client' are optional.
+    """
+    target_configs = target_configs if target_configs is not None else synthesis_targets
+    if not target_configs:
+        return [SynthesisTarget(project_id, gcs_bucket_name, location=location)]
+
+    return [
+        SynthesisTarget(
+            config['project_id'], config['bucket'],
+            credentials=config.get('credentials'),
+            location=config.get('location', location),
+            max_concurrent=config.get('max_concurrent'),
+            name=config.get('name'),
+            tts_client=config.get('tts_client'),
+            storage_client=config.get('storage_client'),
+        )
+        for config in target_configs
+    ]
+
+class TargetPool:
+    """
+    Hands out synthesis targets to workers by free capacity.
+
+    acquire() blocks until some target has a free slot and is not cooling
+    down after quota exhaustion; operations already running on an exhausted
+    target finish normally, but it gets no new work until the cooldown ends.
+    """
+
+    def __init__(self, targets, cooldown_seconds=None):
+        self.targets = list(targets)
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else quota_cooldown_seconds
+        self._condition = threading.Condition()
+        self._in_flight = {target: 0 for target in self.targets}
+        self._cooldown_until = {target: 0.0 for target in self.targets}
+
+    @property
+    def capacity(self):
+        """Total operations that may run at once across all targets."""
+        return sum(target.max_concurrent for target in self.targets)
+
+    def _available(self, now):
+        return [
+            target for target in self.targets
+            if self._cooldown_until[target] <= now and self._in_flight[target] < target.max_concurrent
+        ]
+
+    def acquire(self):
+        """Reserves a slot on the target with the most free capacity, waiting if none is available."""
+        with self._condition:
+            while True:
+                now = time.time()
+                available = self._available(now)
+                if available:
+                    target = max(available, key=lambda t: t.max_concurrent - self._in_flight[t])
+                    self._in_flight[target] += 1
+                    return target
+
+                # Wake up when a slot frees or the earliest cooldown ends
+                cooling = [until for until in self._cooldown_until.values() if until > now]
+                self._condition.wait(timeout=(min(cooling) - now) if cooling else None)
+
+    def release(self, target):
+        """Frees the slot reserved by acquire()."""
+        with self._condition:
+            self._in_flight[target] -= 1
+            self._condition.notify_all()
+
+    def mark_exhausted(self, target):
+        """Skips a target for cooldown_seconds after it reports quota exhaustion."""
+        with self._condition:
+            self._cooldown_until[target] = time.time() + self.cooldown_seconds
+            logger.warning(f"⏸️ Target '{target.name}' exhausted its quota; "
+                           f"skipping it for {int(self.cooldown_seconds)} seconds")
+            self._condition.notify_all()
+
+class SynthesisProgress:
+    """
+    Live whole-book view of in-flight synthesis operations and downloads.
+
+    Workers report operation metadata and download byte counts through the
+    update methods, which only take a lock; a background thread redraws one
+    tqdm bar every progress_refresh_seconds. Progress is weighted by text
+    size, and the ETA comes from the observed throughput of that weight.
+    """
+
+    # Share of each job's weight covered by synthesis; the rest is the download
+    SYNTHESIS_SHARE = 0.9
+
+    def __init__(self, expected_sizes, refresh_seconds=None):
+        """expected_sizes maps each job key to its (estimated) text size in bytes."""
+        self.refresh_seconds = refresh_seconds or progress_refresh_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._weights = {key: max(size or 0, 1) for key, size in expected_sizes.items()}
+        self._jobs = {
+            key: {'phase': 'queued', 'synthesis': 0.0, 'download': 0.0, 'operation_start': None}
+            for key in expected_sizes
+        }
+
+    def add_job(self, job):
+        """Replaces a job's estimated weight with its real preprocessed text size."""
+        with self._lock:
+            if job['key'] not in self._jobs:
+                self._jobs[job['key']] = {'phase': 'queued', 'synthesis': 0.0, 'download': 0.0,
+                                          'operation_start': None}
+            if job.get('text_size'):
+                self._weights[job['key']] = max(job['text_size'], 1)
+            # A packed job covers its members' progress from now on
+            for member in job.get('members', []):
+                member_key = (member['order'], job['voice_name'])
+                if member_key != job['key']:
+                    self._jobs.pop(member_key, None)
+                    self._weights.pop(member_key, None)
+
+    def update_operation(self, key, metadata):
+        """Records an operation's SynthesizeLongAudioMetadata (progress_percentage, start_time)."""
+        percentage = getattr(metadata, 'progress_percentage', 0.0) or 0.0
+        start_time = getattr(metadata, 'start_time', None)
+        with self._lock:
+            state = self._jobs[key]
+            state['phase'] = 'synthesizing'
+            state['synthesis'] = min(max(percentage / 100, state['synthesis']), 1.0)
+            if start_time and hasattr(start_time, 'timestamp'):
+                state['operation_start'] = start_time.timestamp()
+
+    def update_download(self, key, bytes_done, total_bytes):
+        """Records byte progress of a running download."""
+        with self._lock:
+            state = self._jobs[key]
+            state['phase'] = 'downloading'
+            state['synthesis'] = 1.0
+            state['download'] = min(bytes_done / total_bytes, 1.0) if total_bytes else 0.0
+
+    def finish(self, key, success):
+        """Marks a job as done (or failed, which drops its weight from the book total)."""
+        with self._lock:
+            state = self._jobs[key]
+            state['phase'] = 'done' if success else 'failed'
+            if success:
+                state['synthesis'] = state['download'] = 1.0
+
+    def _job_fraction(self, state):
+        return self.SYNTHESIS_SHARE * state['synthesis'] + (1 - self.SYNTHESIS_SHARE) * state['download']
+
+    def snapshot(self):
+        """
+        Returns (percent_complete, eta_seconds, active) for the whole book.
+
+        active is a list of (key, phase, job_percent, job_eta_seconds) for in-flight jobs.
+        """
+        now = time.time()
+        with self._lock:
+            total_weight = sum(self._weights[key] for key, state in self._jobs.items() if state['phase'] != 'failed')
+            done_weight = sum(self._weights[key] * self._job_fraction(state)
+                              for key, state in self._jobs.items() if state['phase'] != 'failed')
+            active = []
+            for key, state in self._jobs.items():
+                if state['phase'] not in ('synthesizing', 'downloading'):
+                    continue
+                fraction = self._job_fraction(state)
+                job_eta = None
+                if state['operation_start'] and 0 < state['synthesis'] < 1:
+                    running = now - state['operation_start']
+                    job_eta = running * (1 - state['synthesis']) / state['synthesis']
+                active.append((key, state['phase'], fraction * 100, job_eta))
+
+        percent = 100 * done_weight / total_weight if total_weight else 100.0
+        elapsed = now - self._started if self._started else 0
+        eta = None
+        if done_weight > 0 and elapsed > 0:
+            eta = (total_weight - done_weight) / (done_weight / elapsed)
+        return percent, eta, sorted(active)
+
+    def _format_postfix(self, eta, active):
+        parts = [f"ETA {tqdm.format_interval(eta)}" if eta is not None else "ETA --:--"]
+        for (order, voice), phase, job_percent, job_eta in active[:4]:
+            marker = "↓" if phase == 'downloading' else ""
+            remaining = f" ~{tqdm.format_interval(job_eta)}" if job_eta is not None else ""
+            parts.append(f"#{order} {marker}{job_percent:.0f}%{remaining}")
+        if len(active) > 4:
+            parts.append(f"+{len(active) - 4} more")
+        return " | ".join(parts)
+
+    def _render_loop(self):
+        with tqdm(total=100, desc="🎧 Processing", unit="%",
+                  bar_format='{l_bar}{bar}| {n:.0f}% [{elapsed}{postfix}]') as pbar:
+            while True:
+                stopping = self._stop.wait(self.refresh_seconds)
+                percent, eta, active = self.snapshot()
+                pbar.n = percent
+                pbar.set_postfix_str(self._format_postfix(eta, active), refresh=False)
+                pbar.refresh()
+                if stopping:
+                    break
+
+    def __enter__(self):
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._render_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+def discard_invalid_output(job):
+    """Removes a job's rejected WAV(s) and resets it for another synthesis round; returns its GCS URI."""
+    for path in [job.get('local_path')] + list(job.get('output_paths', [])):
+        if path and os.path.exists(path):
+            os.remove(path)
+    gcs_uri = job['gcs_uri']
+    for field in ('gcs_uri', 'latency', 'local_path', 'problems', 'output_paths'):
+        job.pop(field, None)
+    return gcs_uri
+
+def voice_output_directory(voice_name, fan_out):
+    """Returns the local output directory for a voice (per-voice subfolder in fan-out mode)."""
+    if fan_out:
+        return local_output_directory / voice_name
+    return local_output_directory
+
+def process_synthesis_job(job, target_pool, model, progress):
+    """
+    Synthesizes one (chapter, voice) job and downloads the result, reporting live progress.
+
+    The job runs on whichever target the pool hands out; if that target reports
+    quota exhaustion it is put on cooldown and the job moves to the next one.
+    """
+    key = job['key']
+    if job['processed_text'] is None:
+        # Preprocessing failed or the chapter is over the size limit
+        job['gcs_uri'], job['latency'] = None, None
+        progress.finish(key, False)
+        return job
+
+    max_attempts = retry_attempts * len(target_pool.targets)
+
+    for _ in range(max_attempts):
+        target = target_pool.acquire()
+        try:
+            job['gcs_uri'], job['latency'] = submit_long_audio_synthesis(
+                job['processed_text'], job['text_size'], job['original_title'],
+                job['base_filename'], target.bucket, target.project_id, target.location,
+                job['voice_name'], job['voice_language_code'], job['gcs_prefix'], model,
+                progress_callback=lambda metadata: progress.update_operation(key, metadata),
+                client=target.tts_client(), reroute_on_quota=True,
+                input_type=job.get('input_type', "text")
+            )
+            job['target'] = target
+            break
+        except gcp_exceptions.ResourceExhausted:
+            target_pool.mark_exhausted(target)
+            job['gcs_uri'], job['latency'] = None, None
+        finally:
+            target_pool.release(target)
+    else:
+        logger.error(f"❌ FINAL FAILURE: Quota exhausted on every target for '{job['original_title']}'")
+
+    if not job['gcs_uri']:
+        progress.finish(key, False)
+        return job
+
+    job['final_filename'] = job['base_filename'] + ".wav"
+    job['output_paths'] = [job['output_directory'] / job['final_filename']]
+    job['output_directory'].mkdir(parents=True, exist_ok=True)
+    job['local_path'] = download_from_gcs(
+        job['gcs_uri'], job['output_directory'], job['final_filename'], target.storage_client(),
+        progress_callback=lambda done, total: progress.update_download(key, done, total)
+    )
+
+    job['problems'] = []
+    parts = [(job['local_path'], job['processed_text'])]
+    if job['local_path'] and job.get('members'):
+        # Cut the packed audio back into one file per chapter at the pause markers
+        member_paths = [
+            job['output_directory'] / (generate_filename(audiobook_base_name, member['order']) + ".wav")
+            for member in job['members']
+        ]
+        job['problems'] = split_packed_wav(job['local_path'], member_paths)
+        if not job['problems']:
+            # Only now does this job own the chapter files (a failed split leaves earlier copies alone)
+            job['output_paths'] = member_paths
+            parts = [(str(path), member['processed_text']) for path, member in zip(member_paths, job['members'])]
+
+    if job['local_path'] and validate_audio and not job['problems']:
+        # Durations are only enforced against a rate learned for this voice; the
+        # ~1000 chars/min default is far off for e.g. Japanese or Korean voices
+        duration_learned = bool(model and model.get('seconds_per_char'))
+        for path, text in parts:
+            expected_seconds = predict_audio_seconds(len(text), model)
+            job['problems'] += [f"{os.path.basename(path)}: {problem}"
+                                for problem in validate_wav_file(path, expected_seconds if duration_learned else None)]
+            duration = None if duration_learned else read_wav_duration(path)
+            if duration and abs(duration - expected_seconds) > expected_seconds * duration_tolerance:
+                logger.info(f"ℹ️ '{os.path.basename(path)}' is {duration:.0f}s, rough estimate was "
+                            f"{expected_seconds:.0f}s (not checked until {job['voice_name']} has history)")
+    for problem in job['problems']:
+        logger.warning(f"⚠️ Audio check failed for '{job['final_filename']}' ({job['voice_name']}): {problem}")
+
+    progress.finish(key, bool(job['local_path']))
+    return job
+
+def pack_prepared_chapters(prepared_chapters):
+    """
+    Joins runs of consecutive short chapters into packed requests.
+
+    Prepared chapters may arrive in any order. Long chapters are passed on
+    as soon as they arrive; short ones (up to pack_max_chapter_bytes) are held
+    until their neighbours are known, and runs of them are combined (up to
+    pack_max_request_bytes in either input format). Packed entries keep the
+    original chapters in 'members'; the request text is built per voice by
+    build_synthesis_jobs().
+    """
+    waiting = {}
+    passed_through = set()
+    next_order = 1
+    pack = []
+
+    def flush():
+        if len(pack) == 1:
+            yield pack[0]
+        elif pack:
+            ssml = packed_request_text(pack, "ssml")
+            yield {
+                'order': pack[0]['order'],
+                'original_title': f"{pack[0]['original_title']} … {pack[-1]['original_title']} ({len(pack)} chapters)",
+                'processed_text': ssml,
+                'text_size': len(ssml.encode('utf-8')),
+                'members': list(pack),
+            }
+        pack.clear()
+
+    def packed_size(chapters):
+        return max(len(packed_request_text(chapters, input_type).encode('utf-8')) for input_type in ("ssml", "markup"))
+
+    for chapter in prepared_chapters:
+        if chapter['processed_text'] is None or chapter['text_size'] > pack_max_chapter_bytes:
+            # Nothing to pack; don't hold it back behind slower chapters
+            passed_through.add(chapter['order'])
+            yield chapter
+        else:
+            waiting[chapter['order']] = chapter
+
+        while next_order in waiting or next_order in passed_through:
+            if next_order in passed_through:
+                # A long chapter ends the current run
+                passed_through.discard(next_order)
+                next_order += 1
+                yield from flush()
+                continue
+
+            chapter = waiting.pop(next_order)
+            next_order += 1
+            if packed_size(pack + [chapter]) > pack_max_request_bytes:
+                yield from flush()
+            pack.append(chapter)
+
+    # Anything left waiting means an order gap; release it as-is
+    yield from flush()
+    for order in sorted(waiting):
+        yield waiting[order]
+
+def packed_input_type(name):
+    """SynthesisInput field a voice's packed requests use: markup for Chirp 3 HD, SSML otherwise."""
+    return "markup" if any(marker in name for marker in markup_voices) else "ssml"
+
+def packed_request_text(members, input_type):
+    """Joins member chapter texts with the pause marker for the given input type."""
+    if input_type == "markup":
+        marker = " ".join([pack_markup_pause] * pack_markup_pause_count)
+        return f"\n{marker}\n".join(member['processed_text'] for member in members)
+    marker = f'<break time="{pack_marker_seconds:g}s"/>'
+    body = f"\n{marker}\n".join(xml_escape(member['processed_text']) for member in members)
+    return f"<speak>{body}</speak>"
+
+def unpack_job(job, fan_out):
+    """Turns a packed job back into one job per member chapter (for re-synthesis)."""
+    return build_synthesis_jobs(job['members'], [(job['voice_language_code'], job['voice_name'])], fan_out)
+
+def build_synthesis_jobs(prepared_chapters, voices, fan_out):
+    """
+    Creates one job dict per (chapter, voice) pair, sharing one preprocessed text per chapter.
+
+    Packed chapters get the request text and input type for each voice.
+
+    Args:
+        prepared_chapters: List of dicts with 'order', 'original_title', 'processed_text', 'text_size'
+        voices: List of (language_code, voice_name) pairs
+        fan_out: Whether outputs go to per-voice folders
+    """
+    jobs = []
+    for chapter in prepared_chapters:
+        if chapter.get('members'):
+            base_filename = generate_packed_filename(audiobook_base_name, chapter['members'][0]['order'],
+                                                     chapter['members'][-1]['order'])
+        else:
+            base_filename = generate_filename(audiobook_base_name, chapter['order'])
+
+        for language_code, name in voices:
+            packed = {}
+            if chapter.get('members'):
+                input_type = packed_input_type(name)
+                processed_text = packed_request_text(chapter['members'], input_type)
+                packed = {
+                    'input_type': input_type,
+                    'processed_text': processed_text,
+                    'text_size': len(processed_text.encode('utf-8')),
+                }
+            jobs.append({
+                **chapter,
+                **packed,
+                'voice_language_code': language_code,
+                'voice_name': name,
+                'base_filename': base_filename,
+                'gcs_prefix': f"{name}/" if fan_out else "",
+                'output_directory': voice_output_directory(name, fan_out),
+                'key': (chapter['order'], name),
+            })
+    return jobs
+
+def run_synthesis_jobs(jobs, target_pool, models=None, expected_sizes=None):
+    """
+    Submits synthesis jobs concurrently across the target pool.
+
+    Jobs are pulled from any iterable (a list, or a generator fed by the
+    preprocessing pool) into a bounded queue, so submission starts with the
+    first ready chapter. Each worker downloads its WAV as soon as synthesis
+    finishes and checks it, so completed jobs carry 'local_path' (None if the
+    download failed), 'problems' from the audio check and the 'target' they ran on.
+
+    Args:
+        jobs: Iterable of job dicts from build_synthesis_jobs()
+        target_pool: TargetPool of projects/buckets to run operations on
+        models: Optional dict of voice_name -> fitted synthesis model
+        expected_sizes: Dict of job key -> estimated text bytes, needed when jobs is a generator
+
+    Returns:
+        (completed_jobs, failed_jobs) lists of job dicts
+    """
+    models = models or {}
+    if expected_sizes is None:
+        jobs = list(jobs)
+        expected_sizes = {job['key']: job['text_size'] for job in jobs}
+
+    eta_seconds = estimate_queue_eta(
+        [predict_synthesis_latency(size or 0, models.get(voice)) for (_, voice), size in expected_sizes.items()],
+        target_pool.capacity
+    )
+    print(f"⏳ Estimated synthesis time: ~{format_duration(eta_seconds / 60)} "
+          f"({target_pool.capacity} operations in parallel across {len(target_pool.targets)} target(s))")
+
+    completed_jobs = []
+    failed_jobs = []
+    results_lock = threading.Lock()
+    job_queue = queue.Queue(maxsize=preprocess_queue_size)
+
+    def feed_jobs():
+        try:
+            for job in jobs:
+                job_queue.put(job)
+        except Exception as e:
+            logger.error(f"❌ Preparing synthesis jobs failed: {e}")
+        finally:
+            job_queue.put(None)
+
+    def run_worker(progress):
+        while True:
+            job = job_queue.get()
+            if job is None:
+                job_queue.put(None)  # Let the other workers see the end too
+                return
+
+            progress.add_job(job)
+            try:
+                process_synthesis_job(job, target_pool, models.get(job['voice_name']), progress)
+            except Exception as e:
+                logger.error(f"❌ Synthesis worker crashed for '{job['original_title']}': {e}")
+                job['gcs_uri'] = None
+                progress.finish(job['key'], False)
+
+            with results_lock:
+                if job.get('gcs_uri'):
+                    completed_jobs.append(job)
+                    logger.info(f"✅ Chapter {job['order']} ({job['voice_name']}) completed successfully")
+                else:
+                    failed_jobs.append(job)
+                    logger.error(f"❌ Chapter {job['order']} ({job['voice_name']}) was skipped: '{job['original_title']}'")
+
+    with SynthesisProgress(expected_sizes) as progress:
+        feeder = threading.Thread(target=feed_jobs, daemon=True)
+        feeder.start()
+        with ThreadPoolExecutor(max_workers=target_pool.capacity) as executor:
+            for worker in [executor.submit(run_worker, progress) for _ in range(target_pool.capacity)]:
+                worker.result()
+        feeder.join()
+
+    completed_jobs.sort(key=lambda job: (job['order'], job['voice_name']))
+    failed_jobs.sort(key=lambda job: (job['order'], job['voice_name']))
+    return completed_jobs, failed_jobs
+
+class ChapterPreprocessor:
+    """
+    Runs prepare_chapter_text for many chapters in a process pool.
+
+    Work starts as soon as chapters are submitted, typically right after
+    extraction, so preprocessing overlaps with the cost prompt and chapter
+    menu. prepared_chapters() then yields results in completion order.
+    """
+
+    def __init__(self, chapters_list, workers=None):
+        self.chapters_list = chapters_list
+        self._executor = ProcessPoolExecutor(max_workers=workers or preprocess_workers)
+        self._futures = {}
+        # Fetch the NLTK data once here rather than racing in every worker
+        tokenize_sentences("Ready.")
+
+    def submit(self, indices):
+        """Starts preprocessing the given chapter indices (already started ones are skipped)."""
+        for index in indices:
+            if index not in self._futures:
+                title, text, chapter_num, original_title = self.chapters_list[index]
+                self._futures[index] = self._executor.submit(
+                    prepare_chapter_text, title, text, chapter_num, original_title
+                )
+
+    def prepared_chapters(self, selected_indices):
+        """
+        Yields prepared chapter dicts for the selection as each one finishes.
+
+        Chapters are numbered by their position in selected_indices;
+        'processed_text' is None for chapters that can't be synthesized.
+        """
+        self.submit(selected_indices)
+        for index, future in self._futures.items():
+            if index not in selected_indices:
+                future.cancel()
+
+        orders = {index: order for order, index in enumerate(selected_indices, 1)}
+        futures = {self._futures[index]: index for index in selected_indices}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                processed_text, text_size = future.result()
+            except Exception as e:
+                logger.error(f"CRITICAL: Text preprocessing failed for '{self.chapters_list[index][3]}': {e}")
+                processed_text, text_size = None, None
+
+            yield {
+                'order': orders[index],
+                'original_title': self.chapters_list[index][3],
+                'processed_text': processed_text,
+                'text_size': text_size,
+            }
+
+    def shutdown(self):
+        """Stops the worker processes, dropping any preprocessing not yet started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def build_preview_excerpt(processed_text, sentence_count=None, mode=None):
+    """
+    Picks a short excerpt of a processed chapter for preview synthesis.
+
+    Args:
+        processed_text: Chapter text after robust_text_preprocessing()
+        sentence_count: Number of sentences to keep (default: preview_sentence_count)
+        mode: 'start' for the opening sentences, 'sample' for sentences spread across the chapter
+
+    Returns:
+        Excerpt text that fits in one synchronous TTS request
+    """
+    sentence_count = sentence_count or preview_sentence_count
+    mode = mode or preview_excerpt_mode
+
+    sentences = tokenize_sentences(processed_text)
+    if mode == 'sample' and len(sentences) > sentence_count:
+        # Keep the announcement, then evenly spaced sentences from the rest
+        step = (len(sentences) - 1) / max(sentence_count - 1, 1)
+        indices = sorted({int(round(i * step)) for i in range(sentence_count)})
+        sentences = [sentences[i] for i in indices]
+    else:
+        sentences = sentences[:sentence_count]
+
+    excerpt = ""
+    for sentence in sentences:
+        candidate = f"{excerpt} {sentence}".strip()
+        if len(candidate.encode('utf-8')) > preview_max_bytes:
+            break
+        excerpt = candidate
+
+    if not excerpt:
+        excerpt = processed_text.encode('utf-8')[:preview_max_bytes].decode('utf-8', errors='ignore')
+    return excerpt
+
+def synthesize_preview_clip(excerpt, output_path, voice_name, voice_language_code, client=None):
+    """Synthesizes a preview excerpt with the synchronous TTS API and writes it as a WAV file."""
     try:
-        storage_client = StorageClient()
+        client = client or texttospeech_v1.TextToSpeechClient()
+        response = client.synthesize_speech(
+            input={"text": excerpt},
+            voice={"language_code": voice_language_code, "name": voice_name},
+            audio_config={"audio_encoding": texttospeech_v1.AudioEncoding.LINEAR16},
+        )
+        # LINEAR16 responses already include the WAV header
+        with open(output_path, 'wb') as f:
+            f.write(response.audio_content)
+        return output_path
+
+    except Exception as e:
+        logger.error(f"❌ Preview synthesis failed for '{output_path}': {e}")
+        return None
+
+def run_preview(prepared_chapters, voices, fan_out):
+    """
+    Writes a short preview clip per (chapter, voice) pair using concurrent synchronous requests.
+
+    Returns:
+        (written_paths, excerpt_characters)
+    """
+    client = texttospeech_v1.TextToSpeechClient()
+    clips = []
+    for chapter in prepared_chapters:
+        excerpt = build_preview_excerpt(chapter['processed_text'])
+        for language_code, name in voices:
+            directory = preview_output_directory / name if fan_out else preview_output_directory
+            directory.mkdir(parents=True, exist_ok=True)
+            filename = f"{generate_filename(audiobook_base_name, chapter['order'])}_preview.wav"
+            clips.append((excerpt, directory / filename, name, language_code))
+
+    written_paths = []
+    with tqdm(total=len(clips), desc="🔊 Previewing", unit="clip") as pbar:
+        with ThreadPoolExecutor(max_workers=preview_workers) as executor:
+            futures = [executor.submit(synthesize_preview_clip, *clip, client) for clip in clips]
+            for future in as_completed(futures):
+                output_path = future.result()
+                if output_path:
+                    written_paths.append(output_path)
+                pbar.update(1)
+
+    excerpt_characters = sum(len(clip[0]) for clip in clips)
+    return sorted(written_paths), excerpt_characters
+
+def parse_gcs_uri(gcs_uri):
+    """Splits a gs:// URI into (bucket_name, object_name)."""
+    gcs_path = gcs_uri.replace("gs://", "")
+    bucket_name = gcs_path.split("/")[0]
+    object_name = "/".join(gcs_path.split("/")[1:])
+    return bucket_name, object_name
+
+def get_storage_client(credentials=None, project=None):
+    """Creates a Cloud Storage client, using the local emulator when configured."""
+    if storage_emulator_host:
+        from google.auth.credentials import AnonymousCredentials
+        return StorageClient(project=project or project_id, credentials=AnonymousCredentials(),
+                             client_options={"api_endpoint": storage_emulator_host})
+    if credentials is not None:
+        return StorageClient(project=project, credentials=credentials)
+    return StorageClient()
+
+class ProgressFileWriter:
+    """File wrapper that reports (bytes_done, total_bytes) on every write."""
+
+    def __init__(self, file_obj, total_bytes, progress_callback):
+        self.file_obj = file_obj
+        self.total_bytes = total_bytes
+        self.progress_callback = progress_callback
+        self.bytes_done = 0
+
+    def write(self, data):
+        written = self.file_obj.write(data)
+        self.bytes_done += len(data)
+        self.progress_callback(self.bytes_done, self.total_bytes)
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self.file_obj, name)
+
+def download_from_gcs(gcs_uri, local_directory, final_filename, storage_client=None,
+                      progress_callback=None):
+    """Downloads a file from Google Cloud Storage, reporting (bytes_done, total_bytes) if asked."""
+    local_file_path = os.path.join(local_directory, final_filename)
+    try:
+        storage_client = storage_client or get_storage_client()
         
-        gcs_path = gcs_uri.replace("gs://", "")
-        bucket_name = gcs_path.split("/")[0]
-        object_name = "/".join(gcs_path.split("/")[1:])
+        bucket_name, object_name = parse_gcs_uri(gcs_uri)
         
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(object_name)
         
-        local_file_path = os.path.join(local_directory, final_filename)
-        
-        print(f"Downloading to '{final_filename}'...")
-        blob.download_to_filename(local_file_path)
-        print(f"✅ Downloaded successfully")
+        logger.info(f"Downloading to '{final_filename}'...")
+        # Write to a .part file so an interrupted download never looks like a finished chapter
+        if progress_callback:
+            # download_to_file keeps the CRC32C/MD5 check; the wrapper only counts bytes
+            blob.reload()
+            with open(local_file_path + ".part", 'wb') as target:
+                blob.download_to_file(ProgressFileWriter(target, blob.size, progress_callback))
+        else:
+            blob.download_to_filename(local_file_path + ".part")
+        os.replace(local_file_path + ".part", local_file_path)
+        logger.info(f"✅ Downloaded '{final_filename}' successfully")
         
         return local_file_path
     
     except Exception as e:
         logger.error(f"❌ Error downloading from GCS: {e}")
+        if os.path.exists(local_file_path + ".part"):
+            os.remove(local_file_path + ".part")
+        return None
+
+def cleanup_gcs_files(gcs_uris, storage_client=None):
+    """
+    Deletes temporary files from Google Cloud Storage using batched requests.
+
+    Args:
+        gcs_uris: List of gs:// URIs to delete
+        storage_client: Optional existing storage client to reuse
+
+    Returns:
+        Number of objects that were deleted
+    """
+    if not gcs_uris:
+        return 0
+
+    storage_client = storage_client or get_storage_client()
+    deleted = 0
+
+    for start in range(0, len(gcs_uris), gcs_batch_size):
+        batch_uris = gcs_uris[start:start + gcs_batch_size]
+        try:
+            with storage_client.batch():
+                for gcs_uri in batch_uris:
+                    bucket_name, object_name = parse_gcs_uri(gcs_uri)
+                    storage_client.bucket(bucket_name).blob(object_name).delete()
+            deleted += len(batch_uris)
+        except Exception as e:
+            # The batch raises if any delete failed; redo it one object at a time to get the real count
+            logger.warning(f"Batch delete of {len(batch_uris)} GCS files had errors ({e}), retrying individually")
+            for gcs_uri in batch_uris:
+                bucket_name, object_name = parse_gcs_uri(gcs_uri)
+                try:
+                    storage_client.bucket(bucket_name).blob(object_name).delete()
+                    deleted += 1
+                except gcp_exceptions.NotFound:
+                    deleted += 1  # Already gone
+                except Exception as e:
+                    logger.warning(f"Could not cleanup GCS file '{gcs_uri}': {e}")
+
+    logger.info(f"✅ Cleaned up {deleted}/{len(gcs_uris)} temporary files from GCS")
+    return deleted
+
+def reconcile_gcs_outputs(bucket_name, local_directory, base_name=audiobook_base_name,
+                          voice_names=(), storage_client=None):
+    """
+    Matches leftover synthesis outputs in the bucket against local files.
+
+    Objects are named '<base>_<n>_<timestamp>.wav' (or '<voice>/<base>_<n>_<timestamp>.wav'
+    in fan-out mode). For each chapter the newest object is downloaded if '<base>_<n>.wav'
+    is missing locally; every other object for that chapter is stale and gets deleted.
+    Packed outputs ('<base>_<first>-<last>_<timestamp>.wav') are downloaded and split
+    when any of their chapters is missing; only the missing chapters are written. Downloaded files go through the same
+    audio check as a normal run; files that fail it are removed and their
+    objects kept.
+
+    Args:
+        bucket_name: Bucket the synthesis outputs were written to
+        local_directory: Directory holding the final '<base>_<n>.wav' files
+        base_name: Filename base used when the outputs were generated
+        voice_names: Fan-out voices whose outputs live under '<voice>/' prefixes
+        storage_client: Optional existing storage client to reuse
+
+    Returns:
+        Dictionary with counts of found, downloaded, deleted, failed and invalid
+        objects, plus 'paths' of the chapter files that were written
+    """
+    storage_client = storage_client or get_storage_client()
+    pattern = re.compile(rf'^(?:([^/]+)/)?{re.escape(base_name)}_(\d+)(?:-(\d+))?_(\d+)\.wav$')
+    prefixes = [f"{base_name}_"] + [f"{name}/{base_name}_" for name in voice_names]
+
+    outputs_by_chapter = {}
+    for prefix in prefixes:
+        for blob in storage_client.list_blobs(bucket_name, prefix=prefix):
+            match = pattern.match(blob.name)
+            if match:
+                voice_folder = match.group(1) or ""
+                first_number = int(match.group(2))
+                last_number = int(match.group(3)) if match.group(3) else first_number
+                timestamp = int(match.group(4))
+                outputs_by_chapter.setdefault((voice_folder, first_number, last_number), []).append((timestamp, blob))
+
+    to_download = []
+    stale_uris = []
+    for (voice_folder, first_number, last_number), outputs in sorted(outputs_by_chapter.items()):
+        outputs.sort(key=lambda output: output[0], reverse=True)
+        chapter_directory = os.path.join(local_directory, voice_folder)
+        member_paths = [
+            os.path.join(chapter_directory, generate_filename(base_name, number) + ".wav")
+            for number in range(first_number, last_number + 1)
+        ]
+        if last_number > first_number:
+            local_file_path = os.path.join(chapter_directory,
+                                           generate_packed_filename(base_name, first_number, last_number) + ".wav")
+        else:
+            local_file_path = member_paths[0]
+
+        if all(os.path.exists(path) for path in member_paths):
+            stale_outputs = outputs
+        else:
+            os.makedirs(chapter_directory, exist_ok=True)
+            to_download.append((outputs[0][1], local_file_path, member_paths))
+            stale_outputs = outputs[1:]
+
+        stale_uris.extend(f"gs://{bucket_name}/{blob.name}" for _, blob in stale_outputs)
+
+    found = sum(len(outputs) for outputs in outputs_by_chapter.values())
+    logger.info(f"Reconciling {found} objects in gs://{bucket_name}: "
+                f"{len(to_download)} to download, {len(stale_uris)} stale")
+
+    # Download to a temporary name so an interrupted transfer never looks complete
+    downloaded = 0
+    failed = 0
+    invalid = 0
+    written_paths = []
+    if to_download:
+        results = transfer_manager.download_many(
+            [(blob, local_file_path + ".part") for blob, local_file_path, _ in to_download],
+            max_workers=reconcile_workers,
+            worker_type=transfer_manager.THREAD,
+        )
+        for (blob, local_file_path, member_paths), result in zip(to_download, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Error downloading '{blob.name}': {result}")
+                failed += 1
+                if os.path.exists(local_file_path + ".part"):
+                    os.remove(local_file_path + ".part")
+                continue
+            # Only chapters missing locally are written; existing (possibly normalized) files are left alone
+            missing_paths = [path for path in member_paths if not os.path.exists(path)]
+            os.replace(local_file_path + ".part", local_file_path)
+            new_files = {local_file_path: local_file_path}
+            if len(member_paths) > 1:
+                split_paths = [path + ".split" for path in member_paths]
+                problems = split_packed_wav(local_file_path, split_paths)
+                if problems:
+                    # Keep the object; a normal run can re-synthesize these chapters
+                    logger.error(f"❌ Could not split '{blob.name}': {'; '.join(problems)}")
+                    os.remove(local_file_path)
+                    failed += 1
+                    continue
+                new_files = {}
+                for path, split_path in zip(member_paths, split_paths):
+                    if path in missing_paths:
+                        new_files[path] = split_path
+                    else:
+                        os.remove(split_path)
+
+            if validate_audio:
+                # No chapter text here, so the duration can't be checked
+                problems = [f"{os.path.basename(path)}: {problem}"
+                            for path, new_file in new_files.items() for problem in validate_wav_file(new_file)]
+                if problems:
+                    logger.error(f"❌ Audio check failed for '{blob.name}': {'; '.join(problems)}")
+                    for new_file in new_files.values():
+                        os.remove(new_file)
+                    invalid += 1
+                    continue
+
+            for path, new_file in new_files.items():
+                os.replace(new_file, path)
+            stale_uris.append(f"gs://{bucket_name}/{blob.name}")
+            written_paths.extend(new_files)
+            downloaded += 1
+
+    deleted = cleanup_gcs_files(stale_uris, storage_client)
+
+    return {
+        'found': found,
+        'downloaded': downloaded,
+        'deleted': deleted,
+        'failed': failed,
+        'invalid': invalid,
+        'paths': written_paths,
+    }
+
+def parse_wav_header(wav_path):
+    """
+    Reads the RIFF/WAVE header of a 16-bit PCM file.
+
+    Returns:
+        Dictionary with channels, sample_rate, bits_per_sample, block_align,
+        data_offset, data_size (as declared), riff_size and file_size
+
+    Raises:
+        ValueError: If the file is not a readable 16-bit PCM WAV
+    """
+    file_size = os.path.getsize(wav_path)
+    with open(wav_path, 'rb') as f:
+        riff_header = f.read(12)
+        if len(riff_header) < 12:
+            raise ValueError("file too short for a WAV header")
+        riff, riff_size, wave_id = struct.unpack('<4sI4s', riff_header)
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("missing RIFF/WAVE header")
+
+        header = {'riff_size': riff_size, 'file_size': file_size}
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("no data chunk found")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    raise ValueError("truncated fmt chunk")
+                audio_format, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+                if audio_format != 1 or bits != 16:
+                    raise ValueError(f"unsupported format {audio_format} with {bits} bits per sample")
+                header.update(channels=channels, sample_rate=sample_rate,
+                              bits_per_sample=bits, block_align=block_align)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if 'channels' not in header:
+                    raise ValueError("data chunk before fmt chunk")
+                header.update(data_offset=f.tell(), data_size=chunk_size)
+                return header
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+def open_wav_samples(wav_path, header):
+    """Memory-maps the PCM data of a WAV as a (frames, channels) int16 array."""
+    available = header['file_size'] - header['data_offset']
+    declared = header['data_size']
+    # 0 and 0xFFFFFFFF are used by streaming writers that don't know the final size
+    data_size = available if declared in (0, 0xFFFFFFFF) else min(declared, available)
+    frames = data_size // header['block_align']
+    if frames == 0:
+        return np.zeros((0, header['channels']), dtype='<i2')
+    return np.memmap(wav_path, dtype='<i2', mode='r', offset=header['data_offset'],
+                     shape=(frames, header['channels']))
+
+def iter_window_peaks(samples, sample_rate, block_frames=None):
+    """
+    Yields per-window peak amplitudes of a (frames, channels) array, block by block.
+
+    Windows are silence_window_seconds long; only one block is ever read into memory.
+    """
+    block_frames = block_frames or audio_block_frames
+    window_frames = max(int(sample_rate * silence_window_seconds), 1)
+    block_frames = max(block_frames // window_frames, 1) * window_frames
+
+    for start in range(0, len(samples), block_frames):
+        block = np.abs(np.asarray(samples[start:start + block_frames], dtype=np.int32)).max(axis=1)
+        whole = len(block) // window_frames * window_frames
+        peaks = block[:whole].reshape(-1, window_frames).max(axis=1)
+        if whole < len(block):
+            peaks = np.append(peaks, block[whole:].max())
+        yield block, peaks
+
+def longest_silent_run(peaks, carry=0):
+    """
+    Returns (longest_run, trailing_run) of silent windows in peaks.
+
+    carry is the silent run continuing from the previous block.
+    """
+    silent = peaks <= silence_threshold
+    if not silent.any():
+        return 0, 0
+    if silent.all():
+        run = carry + len(silent)
+        return run, run
+    # Run lengths between non-silent windows
+    edges = np.flatnonzero(~silent)
+    gaps = np.diff(np.concatenate(([-1], edges, [len(silent)]))) - 1
+    gaps[0] += carry
+    return int(gaps.max()), int(gaps[-1])
+
+def predict_audio_seconds(text_chars, model=None):
+    """Expected audio length for a text, from past runs or ~1000 chars per minute."""
+    if model and model.get('seconds_per_char'):
+        return text_chars * model['seconds_per_char']
+    return text_chars * 60 / 1000
+
+def validate_wav_file(wav_path, expected_seconds=None):
+    """
+    Checks a downloaded WAV for signs of a broken synthesis.
+
+    The header is compared against the real file length, then the PCM is
+    memory-mapped and scanned in blocks for long digital silence and clipping,
+    and the duration is compared with the expected length for the text.
+
+    Args:
+        wav_path: Path of the downloaded WAV
+        expected_seconds: Expected duration, or None to skip the duration check
+
+    Returns:
+        List of problem descriptions (empty if the file looks fine)
+    """
+    try:
+        header = parse_wav_header(wav_path)
+    except (ValueError, struct.error, OSError) as e:
+        return [f"bad header: {e}"]
+
+    problems = []
+    available = header['file_size'] - header['data_offset']
+    if header['riff_size'] not in (0, 0xFFFFFFFF) and header['riff_size'] + 8 != header['file_size']:
+        problems.append(f"RIFF size {header['riff_size'] + 8} does not match file size {header['file_size']}")
+    if header['data_size'] not in (0, 0xFFFFFFFF) and header['data_size'] > available:
+        problems.append(f"truncated: data chunk declares {header['data_size']} bytes, only {available} present")
+
+    samples = open_wav_samples(wav_path, header)
+    frames = len(samples)
+    if frames == 0:
+        return problems + ["no audio frames"]
+
+    sample_rate = header['sample_rate']
+    window_seconds = max(int(sample_rate * silence_window_seconds), 1) / sample_rate
+    longest_run = carry = 0
+    clipped = 0
+    for block, peaks in iter_window_peaks(samples, sample_rate):
+        block_longest, carry = longest_silent_run(peaks, carry)
+        longest_run = max(longest_run, block_longest)
+        clipped += int(np.count_nonzero(block >= 32767))
+
+    duration = frames / sample_rate
+    if longest_run * window_seconds > max_silence_gap_seconds:
+        problems.append(f"{longest_run * window_seconds:.1f}s of continuous digital silence")
+    if clipped / (frames * header['channels']) > max_clipped_ratio:
+        problems.append(f"{clipped:,} clipped samples")
+    if expected_seconds and abs(duration - expected_seconds) > expected_seconds * duration_tolerance:
+        problems.append(f"duration {duration:.0f}s, expected about {expected_seconds:.0f}s")
+
+    return problems
+
+def split_packed_wav(wav_path, output_paths):
+    """
+    Splits a packed chapter WAV at its pause markers into one file per chapter.
+
+    Silent windows are found block by block; the len(output_paths) - 1 longest
+    silences of at least pack_marker_min_seconds are taken as the markers and
+    each file is cut in the middle of one. The packed file is removed on success.
+
+    Returns:
+        List of problem descriptions (empty if the split worked)
+    """
+    try:
+        header = parse_wav_header(wav_path)
+    except (ValueError, struct.error, OSError) as e:
+        return [f"bad header: {e}"]
+
+    samples = open_wav_samples(wav_path, header)
+    sample_rate = header['sample_rate']
+    window_frames = max(int(sample_rate * silence_window_seconds), 1)
+    trim_level = 32768 * 10 ** (trim_silence_dbfs / 20)
+
+    silent = np.concatenate(
+        [peaks <= trim_level for _, peaks in iter_window_peaks(samples, sample_rate)] or [np.zeros(0, dtype=bool)]
+    )
+    # Start and length of every silent run
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_lengths = np.flatnonzero(edges == -1) - run_starts
+    min_windows = int(pack_marker_min_seconds / silence_window_seconds)
+    candidates = np.flatnonzero(run_lengths >= min_windows)
+
+    markers_needed = len(output_paths) - 1
+    if len(candidates) < markers_needed:
+        return [f"found {len(candidates)} of {markers_needed} chapter markers"]
+
+    longest = candidates[np.argsort(run_lengths[candidates], kind='stable')[::-1][:markers_needed]]
+    cut_windows = sorted(int(run_starts[i] + run_lengths[i] // 2) for i in longest)
+    boundaries = [0] + [window * window_frames for window in cut_windows] + [len(samples)]
+
+    block_frames = audio_block_frames
+    for output_path, start_frame, end_frame in zip(output_paths, boundaries, boundaries[1:]):
+        with wave.open(str(output_path), 'wb') as output:
+            output.setnchannels(header['channels'])
+            output.setsampwidth(2)
+            output.setframerate(sample_rate)
+            for start in range(start_frame, end_frame, block_frames):
+                output.writeframes(np.ascontiguousarray(samples[start:min(start + block_frames, end_frame)]).tobytes())
+
+    del samples
+    os.remove(wav_path)
+    return []
+
+def k_weighting_coefficients(sample_rate):
+    """
+    Returns the two ITU-R BS.1770 K-weighting biquads [(b, a), (b, a)] for a sample rate.
+
+    Stage one is the +4 dB high shelf around 1.5 kHz, stage two the 38 Hz high-pass.
+    """
+    shelf_gain_db, shelf_q, shelf_hz = 4.0, 1 / np.sqrt(2), 1500.0
+    a_gain = 10 ** (shelf_gain_db / 40)
+    w0 = 2 * np.pi * shelf_hz / sample_rate
+    alpha = np.sin(w0) / (2 * shelf_q)
+    cos_w0 = np.cos(w0)
+    shelf_b = [
+        a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 + 2 * np.sqrt(a_gain) * alpha),
+        -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+        a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 - 2 * np.sqrt(a_gain) * alpha),
+    ]
+    shelf_a = [
+        (a_gain + 1) - (a_gain - 1) * cos_w0 + 2 * np.sqrt(a_gain) * alpha,
+        2 * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+        (a_gain + 1) - (a_gain - 1) * cos_w0 - 2 * np.sqrt(a_gain) * alpha,
+    ]
+
+    highpass_q, highpass_hz = 0.5, 38.0
+    w0 = 2 * np.pi * highpass_hz / sample_rate
+    alpha = np.sin(w0) / (2 * highpass_q)
+    cos_w0 = np.cos(w0)
+    highpass_b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+    highpass_a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+
+    return [(np.array(shelf_b) / shelf_a[0], np.array(shelf_a) / shelf_a[0]),
+            (np.array(highpass_b) / highpass_a[0], np.array(highpass_a) / highpass_a[0])]
+
+def integrated_loudness(segment_energies):
+    """
+    Gated integrated loudness (LUFS) from per-100 ms mean-square energies.
+
+    Uses 400 ms blocks with 75% overlap, an absolute gate at -70 LUFS and a
+    relative gate 10 LU below the absolute-gated loudness.
+    """
+    if len(segment_energies) < 4:
+        block_energies = np.array([segment_energies.mean()]) if len(segment_energies) else np.zeros(1)
+    else:
+        block_energies = np.convolve(segment_energies, np.ones(4) / 4, mode='valid')
+
+    with np.errstate(divide='ignore'):
+        block_loudness = -0.691 + 10 * np.log10(block_energies)
+    gated = block_energies[block_loudness > -70.0]
+    if len(gated) == 0:
         return None
 
-def cleanup_gcs_file(gcs_uri):
-    """Deletes the temporary file from Google Cloud Storage."""
+    relative_gate = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+    with np.errstate(divide='ignore'):
+        gated = gated[-0.691 + 10 * np.log10(gated) > relative_gate]
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+def measure_wav_audio(samples, sample_rate, block_frames=None):
+    """
+    First post-processing pass: loudness, peak and speech boundaries, block by block.
+
+    Returns:
+        Dictionary with loudness (LUFS or None), peak, window_frames and the
+        first/last non-silent window indices (None if the file is all silence)
+    """
+    block_frames = block_frames or audio_block_frames
+    segment_frames = max(int(sample_rate * 0.1), 1)
+    window_frames = max(int(sample_rate * silence_window_seconds), 1)
+    step = segment_frames * window_frames // np.gcd(segment_frames, window_frames)
+    block_frames = max(block_frames // step, 1) * step
+    trim_level = 32768 * 10 ** (trim_silence_dbfs / 20)
+
+    filters = k_weighting_coefficients(sample_rate) if lfilter is not None else []
+    filter_states = [np.zeros((2, samples.shape[1])) for _ in filters]
+    segment_energies = []
+    peak = 0
+    first_window = last_window = None
+
+    for start in range(0, len(samples), block_frames):
+        block = np.asarray(samples[start:start + block_frames], dtype=np.float64)
+
+        # Speech boundaries and peak from window maxima
+        magnitudes = np.abs(block).max(axis=1)
+        peak = max(peak, float(magnitudes.max()))
+        whole = len(magnitudes) // window_frames * window_frames
+        peaks = magnitudes[:whole].reshape(-1, window_frames).max(axis=1)
+        if whole < len(magnitudes):
+            peaks = np.append(peaks, magnitudes[whole:].max())
+        loud = np.flatnonzero(peaks > trim_level)
+        if len(loud):
+            offset = start // window_frames
+            if first_window is None:
+                first_window = offset + int(loud[0])
+            last_window = offset + int(loud[-1])
+
+        # K-weighted mean square per 100 ms segment, filter state carried across blocks
+        weighted = block / 32768
+        for (b, a), state in zip(filters, filter_states):
+            weighted, state[:] = lfilter(b, a, weighted, axis=0, zi=state)
+        squares = (weighted ** 2).sum(axis=1)
+        whole = len(squares) // segment_frames * segment_frames
+        segment_energies.append(squares[:whole].reshape(-1, segment_frames).mean(axis=1))
+
+    energies = np.concatenate(segment_energies) if segment_energies else np.zeros(0)
+    return {
+        'loudness': integrated_loudness(energies),
+        'peak': peak,
+        'window_frames': window_frames,
+        'first_window': first_window,
+        'last_window': last_window,
+    }
+
+def postprocess_wav_file(wav_path):
+    """
+    Normalizes a chapter WAV to target_loudness_lufs and trims its silences, in place.
+
+    Two streaming passes over a memory map: the first measures loudness and
+    finds where speech starts and ends, the second writes the gained audio
+    with leading/trailing silence trimmed and internal pauses capped.
+
+    Returns:
+        Dictionary with the measured loudness, applied gain and durations before/after
+    """
+    header = parse_wav_header(wav_path)
+    samples = open_wav_samples(wav_path, header)
+    sample_rate = header['sample_rate']
+    stats = measure_wav_audio(samples, sample_rate)
+
+    if stats['loudness'] is None or stats['first_window'] is None:
+        return {'path': wav_path, 'loudness': None, 'gain_db': 0.0,
+                'seconds_before': len(samples) / sample_rate, 'seconds_after': len(samples) / sample_rate}
+
+    # One gain per chapter, limited so the loudest sample doesn't clip
+    gain_db = float(np.clip(target_loudness_lufs - stats['loudness'], -max_gain_db, max_gain_db))
+    gain = 10 ** (gain_db / 20)
+    if stats['peak'] * gain > 32767:
+        gain = 32767 / stats['peak']
+        gain_db = 20 * np.log10(gain)
+
+    window_frames = stats['window_frames']
+    start_frame = max(stats['first_window'] * window_frames - int(leading_silence_seconds * sample_rate), 0)
+    end_frame = min((stats['last_window'] + 1) * window_frames + int(trailing_silence_seconds * sample_rate),
+                    len(samples))
+    max_silent_windows = int(max_internal_silence_seconds / silence_window_seconds)
+    trim_level = 32768 * 10 ** (trim_silence_dbfs / 20)
+    block_frames = max(audio_block_frames // window_frames, 1) * window_frames
+
+    temporary_path = f"{wav_path}.tmp"
+    frames_written = 0
+    silent_run = 0
+    with wave.open(temporary_path, 'wb') as output:
+        output.setnchannels(header['channels'])
+        output.setsampwidth(2)
+        output.setframerate(sample_rate)
+
+        for start in range(start_frame, end_frame, block_frames):
+            block = np.asarray(samples[start:min(start + block_frames, end_frame)], dtype=np.float64)
+
+            # Cap internal silences: drop windows beyond max_silent_windows in a row
+            magnitudes = np.abs(block).max(axis=1)
+            window_count = -(-len(magnitudes) // window_frames)
+            padded = np.zeros(window_count * window_frames)
+            padded[:len(magnitudes)] = magnitudes
+            silent = padded.reshape(window_count, window_frames).max(axis=1) <= trim_level
+
+            index = np.arange(window_count)
+            last_loud = np.maximum.accumulate(np.where(~silent, index, -1))
+            run = index - last_loud + np.where(last_loud < 0, silent_run, 0)
+            keep_windows = ~silent | (run <= max_silent_windows)
+            silent_run = int(run[-1]) if silent[-1] else 0
+
+            keep = np.repeat(keep_windows, window_frames)[:len(block)]
+            scaled = np.clip(np.round(block[keep] * gain), -32768, 32767).astype('<i2')
+            output.writeframes(scaled.tobytes())
+            frames_written += len(scaled)
+
+    seconds_before = len(samples) / sample_rate
+    del samples
+    os.replace(temporary_path, wav_path)
+    return {
+        'path': wav_path,
+        'loudness': stats['loudness'],
+        'gain_db': gain_db,
+        'seconds_before': seconds_before,
+        'seconds_after': frames_written / sample_rate,
+    }
+
+def postprocess_audio_files(wav_paths):
+    """
+    Runs postprocess_wav_file on every chapter in parallel worker processes.
+
+    Returns:
+        List of result dictionaries for the files that were processed
+    """
+    if lfilter is None:
+        logger.warning("scipy not installed: loudness is measured without K-weighting (pip install scipy)")
+
+    results = []
+    with tqdm(total=len(wav_paths), desc="🔊 Normalizing", unit="file") as pbar:
+        with ProcessPoolExecutor(max_workers=postprocess_workers) as executor:
+            futures = {executor.submit(postprocess_wav_file, str(path)): path for path in wav_paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                    results.append(result)
+                    if result['loudness'] is not None:
+                        logger.info(f"Normalized '{os.path.basename(path)}': {result['loudness']:.1f} LUFS, "
+                                    f"gain {result['gain_db']:+.1f} dB, "
+                                    f"{result['seconds_before']:.0f}s -> {result['seconds_after']:.0f}s")
+                except Exception as e:
+                    logger.error(f"❌ Post-processing failed for '{path}': {e}")
+                pbar.update(1)
+    return results
+
+def load_synthesis_history(history_path=None):
+    """Loads past synthesis records (one JSON object per line) from the history file."""
+    history_path = Path(history_path or synthesis_history_file)
+    if not history_path.exists():
+        return []
+
+    history = []
+    with open(history_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                history.append(json.loads(line))
+            except ValueError:
+                continue
+    return history
+
+def record_synthesis_history(record, history_path=None):
+    """Appends one synthesis record to the history file."""
+    history_path = Path(history_path or synthesis_history_file)
     try:
-        storage_client = StorageClient()
-        
-        gcs_path = gcs_uri.replace("gs://", "")
-        bucket_name = gcs_path.split("/")[0]
-        object_name = "/".join(gcs_path.split("/")[1:])
-        
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(object_name)
-        
-        blob.delete()
-        logger.info(f"✅ Cleaned up temporary file from GCS")
-        
-    except Exception as e:
-        logger.warning(f"Could not cleanup GCS file: {e}")
+        with open(history_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not record synthesis history: {e}")
+
+def read_wav_duration(wav_path):
+    """Returns the audio duration in seconds from a WAV header, or None if unreadable."""
+    try:
+        with wave.open(str(wav_path), 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, OSError) as e:
+        logger.warning(f"Could not read WAV duration of '{wav_path}': {e}")
+        return None
+
+def fit_synthesis_model(history, voice_name):
+    """
+    Fits latency and audio-duration rates from past runs.
+
+    Latency is a least-squares line over text bytes; duration is the pooled
+    ratio of audio seconds to characters. Records for the given voice are
+    used when there are enough of them, otherwise all voices are pooled for
+    latency. The duration rate depends on the voice's language, so it is only
+    learned from the voice's own records.
+
+    Args:
+        history: List of records from load_synthesis_history()
+        voice_name: Voice the model is for
+
+    Returns:
+        Dictionary with latency_intercept, latency_per_byte, seconds_per_char
+        (None without enough history for this voice), max_text_bytes (largest
+        recorded size) and samples, or None if
+        there isn't enough history yet
+    """
+    records = [r for r in history if r.get('voice_name') == voice_name]
+    if len(records) < min_history_samples:
+        records = history
+    records = [r for r in records if r.get('text_bytes') and r.get('latency_seconds')]
+    if len(records) < min_history_samples:
+        return None
+
+    sizes = [r['text_bytes'] for r in records]
+    latencies = [r['latency_seconds'] for r in records]
+    mean_size = sum(sizes) / len(sizes)
+    mean_latency = sum(latencies) / len(latencies)
+    variance = sum((x - mean_size) ** 2 for x in sizes)
 
-def estimate_cost(chapters_list, voice_name):
+    if variance > 0:
+        slope = sum((x - mean_size) * (y - mean_latency) for x, y in zip(sizes, latencies)) / variance
+        slope = max(slope, 0.0)
+    else:
+        slope = 0.0
+    intercept = max(mean_latency - slope * mean_size, 0.0)
+    if slope == 0.0 and intercept == 0.0:
+        return None
+
+    durations = [r for r in history if r.get('voice_name') == voice_name
+                 and r.get('audio_seconds') and r.get('text_chars')]
+    seconds_per_char = None
+    if len(durations) >= min_history_samples:
+        seconds_per_char = sum(r['audio_seconds'] for r in durations) / sum(r['text_chars'] for r in durations)
+
+    return {
+        'latency_intercept': intercept,
+        'latency_per_byte': slope,
+        'seconds_per_char': seconds_per_char,
+        'max_text_bytes': max(sizes),
+        'samples': len(records),
+    }
+
+def predict_synthesis_latency(text_size, model=None):
+    """Predicts how long a long-audio operation takes for the given text size."""
+    if model:
+        return model['latency_intercept'] + model['latency_per_byte'] * text_size
+    # Default assumption without history: roughly half of the default timeout
+    return (300 + text_size / 500) / 2
+
+def predict_synthesis_timeout(text_size, model=None):
+    """
+    Per-chapter timeout: predicted latency with a safety margin, or the default formula.
+
+    The learned line is only trusted within the text sizes it was fitted on;
+    beyond the largest recorded chapter the default formula is the floor.
+    """
+    base_timeout = 300  # 5 minutes base
+    size_timeout = text_size / 500  # 1 second per 500 bytes (more generous)
+    default_timeout = min(base_timeout + size_timeout, max_timeout)
+
+    if model:
+        timeout = min(max(predict_synthesis_latency(text_size, model) * timeout_safety_factor, min_timeout), max_timeout)
+        if text_size > model.get('max_text_bytes', 0):
+            return max(timeout, default_timeout)
+        return timeout
+
+    return default_timeout
+
+def estimate_queue_eta(latencies, workers=None):
+    """Estimates wall-clock seconds to drain a queue of operations across parallel workers."""
+    workers = workers or max_concurrent_operations
+    finish_times = [0.0] * workers
+    # Longest-first greedy assignment to the least busy worker
+    for latency in sorted(latencies, reverse=True):
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + latency)
+    return max(finish_times) if latencies else 0.0
+
+def format_duration(minutes):
+    """Formats a duration in minutes as 'Xh Ym' or 'Ym' text."""
+    if minutes >= 60:
+        hours = int(minutes // 60)
+        return f"{hours}h {int(minutes - hours * 60)}m"
+    return f"{int(minutes)}m"
+
+def estimate_cost(chapters_list, voice_name, model=None):
     """
     Estimate the cost of generating audiobook based on character count.
 
     Args:
         chapters_list: List of (title, text, chapter_num, original_title) tuples
         voice_name: Name of the voice being used
+        model: Optional fitted synthesis model with a learned seconds_per_char
 
     Returns:
         Dictionary with character count, estimated cost, and duration
@@ -736,8 +2490,11 @@ def estimate_cost(chapters_list, voice_name):
     price_per_million = voice_pricing.get(voice_type, 16.00)
     estimated_cost = (total_chars / 1_000_000) * price_per_million
 
-    # Estimate duration (rough approximation: ~1000 chars per minute of audio)
-    duration_minutes = total_chars / 1000
+    # Estimate duration from past runs, or roughly ~1000 chars per minute of audio
+    if model and model.get('seconds_per_char'):
+        duration_minutes = total_chars * model['seconds_per_char'] / 60
+    else:
+        duration_minutes = total_chars / 1000
     duration_hours = duration_minutes / 60
 
     return {
@@ -747,7 +2504,8 @@ def estimate_cost(chapters_list, voice_name):
         'estimated_cost': estimated_cost,
         'duration_minutes': duration_minutes,
         'duration_hours': duration_hours,
-        'chapter_count': len(chapters_list)
+        'chapter_count': len(chapters_list),
+        'duration_learned': bool(model and model.get('seconds_per_char')),
     }
 
 def print_cost_estimate(estimate):
@@ -761,21 +2519,48 @@ def print_cost_estimate(estimate):
     print(f"💰 Estimated cost: ${estimate['estimated_cost']:.2f}")
 
     # Format duration nicely
-    if estimate['duration_hours'] >= 1:
-        hours = int(estimate['duration_hours'])
-        minutes = int((estimate['duration_hours'] - hours) * 60)
-        print(f"⏱️  Estimated duration: ~{hours}h {minutes}m")
-    else:
-        print(f"⏱️  Estimated duration: ~{int(estimate['duration_minutes'])}m")
+    source = "from past runs" if estimate.get('duration_learned') else "~1000 chars/min"
+    print(f"⏱️  Estimated duration: ~{format_duration(estimate['duration_minutes'])} ({source})")
 
     print(f"{'='*60}\n")
 
+def parse_arguments():
+    """Parse command line options (all settings still live in the configuration above)."""
+    parser = argparse.ArgumentParser(description="Convert EPUB/DOCX ebooks into audiobooks with Google Cloud TTS.")
+    parser.add_argument('--reconcile', action='store_true',
+                        help="Download missing outputs and delete stale ones left in the GCS bucket, then exit")
+    parser.add_argument('--preview', action='store_true',
+                        help="Synthesize a short excerpt of each selected chapter instead of the full text")
+    return parser.parse_args()
+
 # --- Main execution ---
 if __name__ == "__main__":
+    args = parse_arguments()
+
     # Create local output directory if it doesn't exist (already created above, but double-check)
     local_output_directory.mkdir(parents=True, exist_ok=True)
     print(f"✓ Output directory ready: {local_output_directory}")
 
+    if args.reconcile:
+        for target in build_synthesis_targets():
+            print(f"\n🔄 Reconciling gs://{target.bucket} with {local_output_directory}...")
+            summary = reconcile_gcs_outputs(target.bucket, str(local_output_directory),
+                                            voice_names=[name for _, name in fan_out_voices],
+                                            storage_client=target.storage_client())
+            print(f"📦 Found: {summary['found']} objects")
+            print(f"📥 Downloaded: {summary['downloaded']} missing files")
+            print(f"🗑️ Deleted: {summary['deleted']} objects")
+            if summary['failed']:
+                print(f"❌ Failed downloads: {summary['failed']} (re-run --reconcile to retry)")
+            if summary['invalid']:
+                print(f"⚠️ Failed the audio check: {summary['invalid']} (left in the bucket, re-synthesize these chapters)")
+            # Recovered chapters get the same loudness and silence treatment as a normal run
+            if normalize_audio and summary['paths']:
+                print(f"🔊 Normalizing loudness and trimming silence for {len(summary['paths'])} files...")
+                postprocess_audio_files(summary['paths'])
+        exit()
+
+    preprocessor = None
     try:
         file_type = get_file_type(str(input_file_path))
         print(f"\n🎧 Enhanced AudioBook Generator")
@@ -810,60 +2595,128 @@ if __name__ == "__main__":
         
         logger.info(f"Found {len(chapters_list)} chapters")
 
-        # Show cost estimate
-        cost_estimate = estimate_cost(chapters_list, voice_name)
-        print_cost_estimate(cost_estimate)
+        # Voices to render; more than one means fan-out into per-voice folders
+        voices = fan_out_voices or [(voice_language_code, voice_name)]
+        fan_out = bool(fan_out_voices)
 
-        # Ask if user wants to proceed
-        proceed = input("⚠️  Proceed with audiobook generation? (y/n): ").strip().lower()
-        if proceed not in ['y', 'yes']:
-            print("Cancelled by user.")
-            exit()
+        # Fit timeout/duration models from previous runs
+        synthesis_history = load_synthesis_history()
+        models = {name: fit_synthesis_model(synthesis_history, name) for _, name in voices}
+
+        # Flag front/back matter and duplicates so they aren't paid for by default
+        skip_reasons = classify_chapters(chapters_list) if skip_boilerplate else {}
+        billable_chapters = [chapter for i, chapter in enumerate(chapters_list) if i not in skip_reasons]
+        if skip_reasons:
+            skipped_characters = sum(len(chapters_list[i][1]) for i in skip_reasons)
+            print(f"\n🧹 Flagged {len(skip_reasons)} front/back matter or duplicate chapters "
+                  f"({skipped_characters:,} characters) to skip")
+
+        # Start preprocessing the likely selection while the user decides
+        preprocessor = ChapterPreprocessor(chapters_list)
+        preprocessor.submit([i for i in range(len(chapters_list)) if i not in skip_reasons])
+
+        # Show cost estimate
+        for _, name in voices:
+            cost_estimate = estimate_cost(billable_chapters, name, models[name])
+            if fan_out:
+                print(f"\n🎙️ {name}")
+            print_cost_estimate(cost_estimate)
+
+        # Ask if user wants to proceed (previews only cost a few cents)
+        if not args.preview:
+            proceed = input("⚠️  Proceed with audiobook generation? (y/n): ").strip().lower()
+            if proceed not in ['y', 'yes']:
+                print("Cancelled by user.")
+                exit()
 
         # Let user select which chapters to process
-        selected_indices = select_chapters_to_process(chapters_list)
+        selected_indices = select_chapters_to_process(chapters_list, skip_reasons)
         
         if not selected_indices:
             print("No chapters selected. Exiting.")
             exit()
-        
-        # Process selected chapters with enhanced tracking
-        print(f"\n🎵 Starting audio synthesis for {len(selected_indices)} chapters...")
-        print("="*60)
 
-        successful_chapters = 0
-        skipped_chapters = []
-        gcs_uris_and_filenames = []
-
-        # Use tqdm for progress bar
-        with tqdm(total=len(selected_indices), desc="🎧 Processing", unit="chapter",
-                  bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]') as pbar:
-
-            for processing_order, chapter_index in enumerate(selected_indices, 1):
-                title, text_content, chapter_num, original_title = chapters_list[chapter_index]
-
-                # Update progress bar with current chapter name
-                pbar.set_postfix_str(f"{original_title[:40]}...")
+        # Chapters from here on come out of the preprocessing pool, shared by every voice
+        prepared_chapters = preprocessor.prepared_chapters(selected_indices)
+
+        if args.preview:
+            prepared_chapters = sorted(
+                (chapter for chapter in prepared_chapters if chapter['processed_text'] is not None),
+                key=lambda chapter: chapter['order']
+            )
+            print(f"\n🔊 Rendering preview clips for {len(prepared_chapters)} chapters x {len(voices)} voice(s)...")
+            preview_paths, preview_characters = run_preview(prepared_chapters, voices, fan_out)
+            preview_cost = sum(
+                preview_characters / len(voices) / 1_000_000 * estimate_cost([], name)['price_per_million']
+                for _, name in voices
+            )
+            print(f"\n🎉 Preview Complete!")
+            print(f"📊 Clips written: {len(preview_paths)}/{len(prepared_chapters) * len(voices)}")
+            print(f"💰 Preview cost: ~${preview_cost:.4f} ({preview_characters:,} characters)")
+            print(f"📁 Location: {preview_output_directory}")
+            exit()
 
-                gcs_uri, final_filename = enhanced_synthesize_long_audio(
-                    title, text_content, chapter_num, original_title,
-                    audiobook_base_name, processing_order, gcs_bucket_name,
-                    project_id, location, voice_name, voice_language_code
-                )
+        # Process selected chapters with enhanced tracking; submission starts with the first ready chapter
+        print(f"\n🎵 Starting audio synthesis for {len(selected_indices)} chapters x {len(voices)} voice(s)...")
+        print("="*60)
 
-                if gcs_uri and final_filename:
-                    gcs_uris_and_filenames.append((gcs_uri, final_filename))
-                    successful_chapters += 1
-                    logger.info(f"✅ Chapter {processing_order} completed successfully")
-                else:
-                    skipped_chapters.append((processing_order, original_title))
-                    logger.error(f"❌ Chapter {processing_order} was skipped: '{original_title}'")
+        expected_sizes = {
+            (order, name): len(chapters_list[index][1].encode('utf-8'))
+            for order, index in enumerate(selected_indices, 1)
+            for _, name in voices
+        }
+        target_pool = TargetPool(build_synthesis_targets())
+        if pack_short_chapters:
+            prepared_chapters = pack_prepared_chapters(prepared_chapters)
+        completed_jobs, failed_jobs = run_synthesis_jobs(
+            (job for chapter in prepared_chapters for job in build_synthesis_jobs([chapter], voices, fan_out)),
+            target_pool, models, expected_sizes
+        )
+        skipped_chapters = []
 
-                # Update progress bar
-                pbar.update(1)
-        
+        # A packed request that failed outright (rejected markup, timeout, no retries left) is retried chapter by chapter
+        packed_failures = [job for job in failed_jobs if job.get('members')]
+        if packed_failures:
+            failed_jobs = [job for job in failed_jobs if not job.get('members')]
+            unpacked_jobs = [retry_job for job in packed_failures for retry_job in unpack_job(job, fan_out)]
+            print(f"\n🔁 Retrying {len(unpacked_jobs)} chapters from failed packed requests one by one...")
+            unpacked_completed, unpacked_failed = run_synthesis_jobs(unpacked_jobs, target_pool, models)
+            completed_jobs = sorted(completed_jobs + unpacked_completed, key=lambda job: (job['order'], job['voice_name']))
+            failed_jobs += unpacked_failed
+
+        # Re-synthesize chapters whose audio failed the integrity check
+        discarded_uris = {}
+        for resynthesis_round in range(max_resynthesis_attempts):
+            invalid_jobs = [job for job in completed_jobs if job.get('problems')]
+            if not invalid_jobs:
+                break
+
+            print(f"\n🔁 Re-synthesizing {len(invalid_jobs)} chapters that failed the audio check "
+                  f"(round {resynthesis_round + 1}/{max_resynthesis_attempts})...")
+            for job in invalid_jobs:
+                discarded_uris.setdefault(job['target'], []).append(discard_invalid_output(job))
+
+            completed_jobs = [job for job in completed_jobs if 'gcs_uri' in job]
+            # Packed chapters are retried one by one in case the markers were the problem
+            retry_jobs = [retry_job for job in invalid_jobs
+                          for retry_job in (unpack_job(job, fan_out) if job.get('members') else [job])]
+            redone_jobs, refailed_jobs = run_synthesis_jobs(retry_jobs, target_pool, models)
+            completed_jobs = sorted(completed_jobs + redone_jobs, key=lambda job: (job['order'], job['voice_name']))
+            failed_jobs += refailed_jobs
+
+        for job in completed_jobs:
+            if job.get('problems'):
+                print(f"⚠️ Chapter {job['order']} ({job['voice_name']}) still fails the audio check: "
+                      f"{'; '.join(job['problems'])}")
+
+        for job in failed_jobs:
+            skipped_chapters.append((job['order'], f"{job['original_title']} ({job['voice_name']})"))
+        skipped_chapters.sort()
+
+        total_jobs = len(selected_indices) * len(voices)
         print("="*60)
-        print(f"✅ Successfully synthesized {successful_chapters}/{len(selected_indices)} chapters")
+        synthesized_chapters = sum(len(job.get('members') or [job]) for job in completed_jobs)
+        print(f"✅ Successfully synthesized {synthesized_chapters}/{total_jobs} chapters")
         
         if skipped_chapters:
             print(f"\n❌ SKIPPED CHAPTERS ({len(skipped_chapters)}):")
@@ -871,28 +2724,49 @@ if __name__ == "__main__":
                 print(f"   {order}. {title}")
             print(f"\nCheck 'audiobook_processing.log' for detailed error information.")
         
-        if gcs_uris_and_filenames:
-            # Download all generated audio files
-            print(f"\n📥 Downloading audio files...")
+        if completed_jobs:
+            # Audio files were downloaded by the workers as each chapter finished
             successful_downloads = 0
-
-            with tqdm(total=len(gcs_uris_and_filenames), desc="💾 Downloading", unit="file",
-                      bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]') as pbar:
-
-                for gcs_uri, final_filename in gcs_uris_and_filenames:
-                    pbar.set_postfix_str(f"{final_filename}")
-                    local_path = download_from_gcs(gcs_uri, local_output_directory, final_filename)
-                    if local_path:
-                        successful_downloads += 1
-                        cleanup_gcs_file(gcs_uri)
-                    pbar.update(1)
+            downloaded_uris = discarded_uris
+
+            for job in completed_jobs:
+                if job.get('local_path'):
+                    successful_downloads += 1
+                    downloaded_uris.setdefault(job['target'], []).append(job['gcs_uri'])
+                if job.get('local_path') and not job.get('problems'):
+                    # Packed markup skews the chars-to-audio rate, so only its latency is kept
+                    record_synthesis_history({
+                        'timestamp': int(time.time()),
+                        'voice_name': job['voice_name'],
+                        'text_bytes': job['text_size'],
+                        'text_chars': len(job['processed_text']),
+                        'latency_seconds': job['latency'],
+                        'audio_seconds': None if job.get('members') else read_wav_duration(job['local_path']),
+                    })
+
+            # Failed downloads stay in the bucket for --reconcile to pick up
+            for target, gcs_uris in downloaded_uris.items():
+                cleanup_gcs_files(gcs_uris, target.storage_client())
+
+            # Even out loudness between chapters and trim long silences
+            if normalize_audio:
+                valid_paths = [path for job in completed_jobs
+                               if job.get('local_path') and not job.get('problems')
+                               for path in job['output_paths']]
+                if valid_paths:
+                    print(f"\n🔊 Normalizing loudness and trimming silence for {len(valid_paths)} files...")
+                    postprocess_audio_files(valid_paths)
             
             print(f"\n🎉 Process Complete!")
-            print(f"📊 Successfully downloaded: {successful_downloads}/{len(gcs_uris_and_filenames)} files")
-            print(f"📁 Location: {local_output_directory}")
+            print(f"📊 Successfully downloaded: {successful_downloads}/{len(completed_jobs)} files")
+            if fan_out:
+                for _, name in voices:
+                    print(f"📁 Location: {voice_output_directory(name, fan_out)}")
+            else:
+                print(f"📁 Location: {local_output_directory}")
             print(f"🏷️ Files named: {audiobook_base_name}_1.wav, {audiobook_base_name}_2.wav, etc.")
             
-            logger.info(f"Process completed. {successful_downloads}/{len(gcs_uris_and_filenames)} files downloaded successfully")
+            logger.info(f"Process completed. {successful_downloads}/{len(completed_jobs)} files downloaded successfully")
         else:
             print(f"\n❌ No audio files were generated successfully.")
             logger.error("No audio files were generated successfully")
@@ -906,7 +2780,7 @@ if __name__ == "__main__":
         error_msg = f"ERROR: Required library missing: {e}"
         print(f"❌ {error_msg}")
         logger.error(error_msg)
-        print("Install with: pip install google-cloud-texttospeech google-cloud-storage ebooklib beautifulsoup4 python-docx nltk")
+        print("Install with: pip install google-cloud-texttospeech google-cloud-storage ebooklib beautifulsoup4 python-docx nltk numpy")
     except ValueError as e:
         error_msg = f"ERROR: {e}"
         print(f"❌ {error_msg}")
@@ -916,4 +2790,7 @@ if __name__ == "__main__":
         print(f"❌ {error_msg}")
         logger.error(error_msg)
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        if preprocessor:
+            preprocessor.shutdown()